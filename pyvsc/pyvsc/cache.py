@@ -0,0 +1,140 @@
+"""
+A persistent cache of downloaded extensions on the remote (ssh) host, which
+is shared by everyone that runs vsc through the same host.
+"""
+
+import logging
+
+
+LOGGER = logging.getLogger(__name__)
+
+class RemoteCache:
+    """
+    Cached extensions are stored at {path}/{extension}/{version}.vsix.
+
+    Downloads are written to a temporary file and then renamed, so a
+    partially-downloaded extension is never visible in the cache. Concurrent
+    vsc users are serialized with flock(1): fetches hold a shared lock on the
+    whole cache (and an exclusive lock on the extension being fetched), and
+    eviction holds an exclusive lock on the whole cache. Extensions that were
+    used recently are never evicted, so they can still be transferred after
+    they've been fetched.
+
+    The cache directory has to be created ahead of time, owned by the group
+    of users that share it, with a mode of 2770. Everything in the cache is
+    created with a umask of 007, so it's only writable by that group, and a
+    world-writable cache directory is refused. The SHA-256 hash of each
+    extension is stored next to it ({version}.vsix.sha256) when it's fetched,
+    so the file can be verified after it's been transferred.
+
+    Arguments:
+        tunnel {Tunnel} -- The tunnel to the remote host.
+        path {str} -- The path to the cache directory on the remote host.
+        max_size {int} -- The number of bytes the cache is allowed to grow
+            to before the least-recently used extensions are evicted.
+    """
+    # extensions used within this many seconds are never evicted
+    grace_period = 600
+
+    def __init__(self, tunnel, path, max_size):
+        self.tunnel = tunnel
+        self.path = path.rstrip('/')
+        self.max_size = max_size
+
+
+    def path_for(self, extension, version):
+        """
+        Returns the path that a version of an extension is cached at.
+        """
+        return '%s/%s/%s.vsix' % (self.path, extension.lower(), version)
+
+
+    def _run(self, command):
+        """
+        Runs a command on the remote host, if the cache directory exists and
+        isn't world-writable, with a umask that keeps the cache private to
+        the cache directory's group.
+
+        Returns:
+            str -- The output of the command.
+        """
+        return self.tunnel.run(
+            'umask 007 && if [ ! -d %s ]; then '
+            'echo "The cache directory %s does not exist." >&2; false; '
+            'elif [ -n "$(find %s -maxdepth 0 -perm -0002)" ]; then '
+            'echo "The cache directory %s is world-writable." >&2; false; '
+            'else %s; fi' % (
+                self.path, self.path, self.path, self.path, command),
+            hide=True)
+
+
+    def lookup(self, keys):
+        """
+        Determines which extensions are already cached.
+
+        Arguments:
+            keys {list} -- (extension, version) tuples to look up.
+
+        Returns:
+            dict -- The sizes (in bytes) of the cached extensions, keyed by
+                (extension, version). Extensions that aren't cached are omitted.
+        """
+        paths = dict((self.path_for(*key), key) for key in keys)
+        command = 'for f in %s; do [ -f "$f" ] && echo "$(wc -c < "$f") $f"; ' \
+            'done; true' % (' '.join(paths))
+
+        cached = {}
+        for line in self.tunnel.run(command, hide=True).splitlines():
+            size, _, path = line.strip().partition(' ')
+            if path.strip() in paths and size.isdigit():
+                cached[paths[path.strip()]] = int(size)
+        return cached
+
+
+    def fetch(self, extension, version, url):
+        """
+        Makes sure that a version of an extension is in the cache, only
+        downloading it if nobody has downloaded it before.
+
+        Arguments:
+            extension {str} -- The name of the extension.
+            version {str} -- The version of the extension.
+            url {str} -- The URL to download the extension from.
+
+        Returns:
+            str -- The SHA-256 hash of the cached extension.
+        """
+        path = self.path_for(extension, version)
+        directory = path.rsplit('/', 1)[0]
+
+        # cache hits are touched, so their modification times reflect
+        # when they were last used. Extensions without a stored hash are
+        # downloaded again.
+        output = self._run(
+            'mkdir -p %s && ( flock -s 8 && ( flock -x 9 && '
+            'if [ -f %s ] && [ -f %s.sha256 ]; then touch %s; '
+            'else curl -sfL -o %s.$$ %s '
+            '&& sha256sum %s.$$ | cut -d " " -f 1 > %s.sha256.$$ '
+            '&& mv %s.$$ %s && mv %s.sha256.$$ %s.sha256 '
+            '|| { rm -f %s.$$ %s.sha256.$$; false; }; fi '
+            '&& cat %s.sha256 ) 9>%s/.lock ) 8>%s/.lock' % (
+                directory, path, path, path, path, url, path, path, path,
+                path, path, path, path, path, path, directory, self.path))
+        return output.strip().splitlines()[-1]
+
+
+    def evict(self):
+        """
+        Removes the least-recently used extensions from the cache until the
+        cache is no larger than its maximum size (or only recently-used
+        extensions are left).
+        """
+        LOGGER.debug('Evicting extensions from %s' % (self.path))
+        self._run(
+            '( flock -x 9 && '
+            'find %s -name \'*.vsix\' -printf \'%%T@ %%s %%p\\n\' | sort -rn '
+            '| awk -v max=%d -v since=$(( $(date +%%s) - %d )) '
+            '\'{ if (total + $2 > max && $1 < since) '
+            '{ print $3; print $3 ".sha256" } else total += $2 }\' '
+            '| xargs -r rm -f ) 9>%s/.lock' % (
+                self.path, self.max_size, self.grace_period, self.path))
@@ -0,0 +1,173 @@
+"""
+Compact records of VS Code extensions, so an extension only has to be parsed
+(from its name or from its .vsix file) once.
+"""
+
+import os
+import re
+import json
+import hashlib
+import zipfile
+
+from xml.etree import ElementTree
+
+
+class Extension(object):
+    """
+    A single version of a VS Code extension, and where it's stored.
+
+    Arguments:
+        id {str} -- The full name of the extension, in the format of
+            {publisher}.{package} (ex: ms-python.python)
+
+    Keyword Arguments:
+        version {str|None} -- The version of the extension, if known.
+        target_platform {str|None} -- The platform a platform-specific
+            extension was built for (ex: linux-x64).
+        size {int|None} -- The size of the .vsix file in bytes.
+        sha256 {str|None} -- The SHA-256 hash of the .vsix file, if known.
+        path {str|None} -- The path to the .vsix file on the local host.
+        remote_path {str|None} -- The path to the .vsix file on the
+            remote host.
+    """
+    __slots__ = ('id', 'version', 'target_platform', 'size', 'sha256',
+        'path', 'remote_path')
+
+    def __init__(self, id, version=None, target_platform=None, size=None,
+                 sha256=None, path=None, remote_path=None):
+        self.id = id
+        self.version = version
+        self.target_platform = target_platform
+        self.size = size
+        self.sha256 = sha256
+        self.path = path
+        self.remote_path = remote_path
+
+
+    @classmethod
+    def parse(cls, text):
+        """
+        Creates an extension record from its name, optionally followed by
+        its version (ex: ms-python.python or ms-python.python@2020.5.1).
+
+        Raises:
+            ValueError -- if the text isn't a valid extension name.
+        """
+        match = re.match(r'^\s*([^.@\s]+\.[^@\s]+)(?:@(\S+))?\s*$', text)
+        if match is None:
+            raise ValueError('"%s" is not a valid extension name.' % (text))
+        return cls(match.group(1), match.group(2))
+
+
+    @classmethod
+    def from_vsix(cls, path, checksum=False):
+        """
+        Creates an extension record by reading the manifests of a .vsix file.
+
+        Keyword Arguments:
+            checksum {bool} -- If True, the whole file is read to determine
+                its SHA-256 hash (default: {False})
+
+        Raises:
+            ValueError -- if the file isn't a valid .vsix file.
+        """
+        try:
+            with zipfile.ZipFile(path) as vsix:
+                manifest = json.loads(
+                    vsix.read('extension/package.json').decode('utf-8'))
+                target_platform = None
+                if 'extension.vsixmanifest' in vsix.namelist():
+                    root = ElementTree.fromstring(
+                        vsix.read('extension.vsixmanifest'))
+                    for element in root.iter():
+                        if element.tag.endswith('Identity'):
+                            target_platform = element.get('TargetPlatform')
+                            break
+        except Exception as e:
+            raise ValueError('"%s" is not a valid .vsix file.' % (path))
+
+        sha256 = None
+        if checksum:
+            sha256 = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    sha256.update(chunk)
+            sha256 = sha256.hexdigest()
+
+        return cls(
+            '%s.%s' % (manifest['publisher'], manifest['name']),
+            manifest['version'],
+            target_platform,
+            os.path.getsize(path),
+            sha256,
+            path,
+        )
+
+
+    @property
+    def publisher(self):
+        return self.id.split('.', 1)[0]
+
+
+    @property
+    def name(self):
+        return self.id.split('.', 1)[1]
+
+
+    @property
+    def key(self):
+        """
+        Uniquely identifies this version of the extension.
+        """
+        return (self.id.lower(), self.version, self.target_platform)
+
+
+    @property
+    def dirname(self):
+        """
+        The name of the directory the editor unpacks this version of the
+        extension into (ex: ms-python.python-2020.5.1 or
+        ms-vscode.cpptools-0.28.0-linux-x64).
+        """
+        dirname = '%s-%s' % (self.id, self.version)
+        if self.target_platform:
+            dirname = '%s-%s' % (dirname, self.target_platform)
+        return dirname.lower()
+
+
+    @property
+    def version_key(self):
+        """
+        A sortable representation of the version (ex: 1.10.0 > 1.9.2). Like
+        semantic versions, pre-releases sort below their release
+        (ex: 1.0.0-beta.2 < 1.0.0-beta.10 < 1.0.0).
+        """
+        release, _, prerelease = (self.version or '').partition('-')
+        release = tuple(int(part) if part.isdigit() else 0
+            for part in release.split('.'))
+
+        if not prerelease:
+            return (release, 1, ())
+
+        # numeric identifiers sort below alphanumeric ones
+        return (release, 0, tuple(
+            (0, int(part), '') if part.isdigit() else (1, 0, part)
+            for part in prerelease.split('.')))
+
+
+    def __eq__(self, other):
+        return isinstance(other, Extension) and self.key == other.key
+
+
+    def __ne__(self, other):
+        return not self == other
+
+
+    def __hash__(self):
+        return hash(self.key)
+
+
+    def __repr__(self):
+        if self.version is None:
+            return self.id
+        return '%s@%s' % (self.id, self.version)
@@ -0,0 +1,190 @@
+"""
+A persistent index of the .vsix files on the local host, so directories of
+extensions don't have to be re-read (and their files re-parsed) every run.
+"""
+
+import os
+import sqlite3
+import logging
+
+from pyvsc.extension import Extension
+
+
+LOGGER = logging.getLogger(__name__)
+
+COLUMNS = ('id', 'version', 'target_platform', 'size', 'sha256', 'path')
+
+class Inventory:
+    """
+    Records are keyed by the path of their .vsix file, and are indexed by
+    extension name and version. A record is only re-read from its .vsix
+    file when the file's size or modification time has changed.
+
+    Arguments:
+        path {str} -- The path to the SQLite database of the inventory.
+
+    Keyword Arguments:
+        readonly {bool} -- If True, the inventory is only read, and is never
+            changed (or created) (default: {False})
+    """
+    def __init__(self, path, readonly=False):
+        self.readonly = readonly
+
+        # sqlite3 only holds locks while a transaction is open, and
+        # transactions are only opened by writes, so a read-only inventory
+        # never blocks other vsc runs from changing the database.
+        if readonly and path != ':memory:':
+            self.db = sqlite3.connect(path)
+            return
+
+        directory = os.path.dirname(path)
+        if path != ':memory:' and not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        self.db = sqlite3.connect(path)
+        self.db.execute(
+            'CREATE TABLE IF NOT EXISTS extensions ('
+            'path TEXT PRIMARY KEY, id TEXT NOT NULL, version TEXT, '
+            'target_platform TEXT, size INTEGER, sha256 TEXT, mtime REAL)')
+        self.db.execute(
+            'CREATE INDEX IF NOT EXISTS extensions_id '
+            'ON extensions (id, version)')
+
+
+    def _select(self, where, args):
+        rows = self.db.execute('SELECT %s FROM extensions WHERE %s' % (
+            ', '.join(COLUMNS), where), args)
+        return [Extension(*row) for row in rows]
+
+
+    def _write(self, statement, args):
+        if not self.readonly:
+            self.db.execute(statement, args)
+
+
+    def _commit(self):
+        if not self.readonly:
+            self.db.commit()
+
+
+    def _insert(self, extension, mtime):
+        # extension names are case-insensitive, so they're stored lowercase
+        self._write(
+            'INSERT OR REPLACE INTO extensions (%s, mtime) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)' % (', '.join(COLUMNS)),
+            [extension.id.lower()] +
+            [getattr(extension, c) for c in COLUMNS[1:]] + [mtime])
+
+
+    def _refresh(self, path):
+        stat = os.stat(path)
+        rows = self.db.execute(
+            'SELECT %s, mtime FROM extensions WHERE path = ?' % (
+                ', '.join(COLUMNS)), (path,)).fetchall()
+
+        if rows and rows[0][-1] == stat.st_mtime \
+                and rows[0][3] == stat.st_size:
+            return Extension(*rows[0][:-1])
+
+        extension = Extension.from_vsix(path)
+        self._insert(extension, stat.st_mtime)
+        return extension
+
+
+    def add(self, extension):
+        """
+        Adds (or replaces) the record of a .vsix file.
+
+        Arguments:
+            extension {Extension} -- The extension, with the path to its file.
+        """
+        self._insert(extension, os.path.getmtime(extension.path))
+        self._commit()
+
+
+    def remove(self, path):
+        """
+        Removes the record of a .vsix file.
+        """
+        self._write('DELETE FROM extensions WHERE path = ?', (path,))
+        self._commit()
+
+
+    def remove_directory(self, directory):
+        """
+        Removes the records of all the .vsix files within a directory.
+        """
+        self._write(
+            'DELETE FROM extensions WHERE path >= ? AND path < ?',
+            _path_range(directory))
+        self._commit()
+
+
+    def find(self, id, version=None):
+        """
+        Returns the records of an extension, optionally limited to a
+        single version.
+        """
+        if version is None:
+            return self._select('id = ?', (id.lower(),))
+        return self._select('id = ? AND version = ?', (id.lower(), version))
+
+
+    def lookup(self, path):
+        """
+        Returns an up-to-date record of a .vsix file, only reading the file
+        if it's new or has changed since it was recorded.
+
+        Raises:
+            ValueError -- if the file isn't a valid .vsix file.
+        """
+        extension = self._refresh(path)
+        self._commit()
+        return extension
+
+
+    def scan(self, directory):
+        """
+        Returns up-to-date records of all the .vsix files in a directory,
+        and forgets the files that have been removed from it.
+
+        Arguments:
+            directory {str} -- The path to a directory of .vsix files.
+
+        Returns:
+            list -- The extensions in the directory.
+        """
+        directory = os.path.abspath(directory)
+        recorded = set(e.path for e in self._select(
+            'path >= ? AND path < ?', _path_range(directory))
+            if os.path.dirname(e.path) == directory)
+
+        extensions = []
+        for f in sorted(os.listdir(directory)):
+            path = os.path.join(directory, f)
+            if not f.endswith('.vsix') or not os.path.isfile(path):
+                continue
+            recorded.discard(path)
+            try:
+                extensions.append(self._refresh(path))
+            except ValueError as e:
+                LOGGER.warning(e)
+
+        for path in recorded:
+            self._write('DELETE FROM extensions WHERE path = ?', (path,))
+        self._commit()
+
+        return extensions
+
+
+    def close(self):
+        self.db.close()
+
+
+def _path_range(directory):
+    """
+    Returns the bounds of the paths within a directory, so the paths can be
+    selected with the primary key index instead of a LIKE pattern.
+    """
+    directory = directory.rstrip('/')
+    return (directory + '/', directory + chr(ord('/') + 1))
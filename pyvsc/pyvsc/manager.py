@@ -8,14 +8,25 @@ from __future__ import print_function
 import os
 import sys
 import re
+import json
 import platform
 import logging
 import configargparse
 
-from time import time
-from shutil import rmtree
+from time import time, sleep
+from shutil import rmtree, copy2
 from getpass import getuser
+from multiprocessing.pool import ThreadPool
+
+try:
+    from urllib.request import pathname2url
+except ImportError:
+    from urllib import pathname2url
 from pyvsc.tunnel import Tunnel
+from pyvsc.cache import RemoteCache
+from pyvsc.plan import Plan, Steps
+from pyvsc.extension import Extension
+from pyvsc.inventory import Inventory
 
 
 # TODO: Figure out how to change log formatting based on the verbosity level
@@ -41,11 +52,54 @@ class Editors:
     insiders = 'code-insiders'
 
 
+class Profile:
+    """
+    An isolated editor profile that extensions can be installed into.
+
+    A profile is identified by the extensions directory that the editor
+    unpacks extensions into, and (optionally) the user data directory
+    that the editor keeps its settings and state in.
+
+    See:
+    - https://code.visualstudio.com/docs/editor/command-line#_advanced-cli-options
+    """
+    def __init__(self, extensions_dir=None, user_data_dir=None):
+        self.extensions_dir = extensions_dir
+        self.user_data_dir = user_data_dir
+
+
+    def editor_args(self):
+        """
+        Returns the editor CLI arguments that target this profile.
+        """
+        args = ''
+        if self.extensions_dir is not None:
+            args += ' --extensions-dir %s' % (self.extensions_dir)
+        if self.user_data_dir is not None:
+            args += ' --user-data-dir %s' % (self.user_data_dir)
+        return args
+
+
+    def __repr__(self):
+        return self.extensions_dir or 'default'
+
+
 class ExtensionManager():
     def __init__(self, **kwargs):
         self.tunnel = kwargs.get('tunnel', None)
         self.dry_run = kwargs.get('dry_run', False)
         self.keep = kwargs.get('keep', False)
+        self.verbose = kwargs.get('verbose', False)
+        self.interval = int(kwargs.get('interval', 900))
+        self.bandwidth = float(kwargs.get('bandwidth', 1.0))
+
+        # if a remote cache directory was specified, downloaded extensions
+        # are kept on the remote host and shared between vsc runs.
+        self.cache = RemoteCache(
+            self.tunnel,
+            kwargs.get('remote_cache'),
+            int(kwargs.get('remote_cache_size', 1024)) * 1024 ** 2,
+        ) if kwargs.get('remote_cache') else None
         self.extensions_dir = None
 
         # FIXME: Be more consistent with the option validations.
@@ -76,9 +130,15 @@ class ExtensionManager():
         self._check_editors_are_installed([self.cmd_source, self.cmd_dest])
 
         # determine the output directory and specified extensions
+        self.inventory = self._process_inventory(kwargs.get('inventory'))
         self.output = self._process_output_directory(kwargs.get('output_dir'))
         self.extensions = self._process_extensions(kwargs.get('extensions'))
 
+        # determine which editor profile(s) the extensions will be installed
+        # into. An empty list means the editor's default profile.
+        self.profiles = self._process_profiles(
+            kwargs.get('extensions_dirs'), kwargs.get('user_data_dirs'))
+
 
     def _get_editor_command(self, command, default=None):
         """
@@ -155,7 +215,6 @@ class ExtensionManager():
         # otherwise, try to create the directory, and return the
         # absolute path if creation was successful.
         try:
-            self._output_preexisted = dir_exists
             command = 'mkdir -p %s' % (d)
             os.system(command)
             self.tunnel.run(command)
@@ -167,19 +226,6 @@ class ExtensionManager():
             sys.exit(1)
 
 
-    def _get_directory_vsix_files(self, directory):
-        """
-        Returns a list of .vsix files from a specified directory
-        
-        Arguments:
-            directory {str} -- The path to a directory in the file system.
-        
-        Returns:
-            list -- A list of .vsix files in the directory.
-        """
-        return [f for f in os.listdir(directory) if f.endswith('.vsix')]
-
-
     def _get_vscode_url(self):
         """
         Returns a URL that can be used to download the latest version of
@@ -213,10 +259,10 @@ class ExtensionManager():
         Returns a cURL command that can be used to download a specified
         VSCode extension, given the extension name and URL.
         """
-        return 'curl %s -o %s/%s.vsix' % (url, self.output, extension)
+        return 'curl %s -o %s/%s.vsix' % (url, self.output, extension.id)
 
 
-    def _get_vsix_url(self, extension):
+    def _get_vsix_url(self, extension, version='latest'):
         """
         Builds the URL for a .vsix vscode extension, given the full 
         name of the extension in the format of {publisher}.{package}
@@ -224,60 +270,89 @@ class ExtensionManager():
         ex: ms-python.python
 
         Arguments:
-            extension {str} -- the name of the extension
+            extension {Extension} -- the extension
+
+        Keyword Arguments:
+            version {str} -- the version of the extension (default: {'latest'})
 
         Returns:
             {str}
         """
-        publisher, package = extension.split('.')
+        publisher, package = extension.publisher, extension.name
         return 'https://%s.gallery.vsassets.io/_apis/public/gallery' \
-            '/publisher/%s/extension/%s/latest/assetbyname' \
+            '/publisher/%s/extension/%s/%s/assetbyname' \
             '/Microsoft.VisualStudio.Services.VSIXPackage' % (
-              publisher, publisher, package)
+              publisher, publisher, package, version)
 
 
-    def cleanup_output_dir(self):
+    def _get_download_sizes(self, extensions):
         """
-        Removes downloaded extension files from the output directory, or if 
-        the output directory wasn't pre-existing, removes the entire directory.
+        Determines the download sizes of extensions with HEAD requests
+        from the remote host. All the requests are made in a single ssh
+        command, to avoid a round trip for each extension.
 
-        If the output directory was pre-existing, we don't want to remove it
-        (since there might be other content in there that the user does not
-        want to remove), so we'll make sure to only remove the files associated
-        with the extensions we've downloaded.
-        
-        If the output directory was not pre-existing (meaning we created it
-        for the purpose of executing pyvsc), then we'll just remove the entire
-        directory.
+        Arguments:
+            extensions {list} -- The extensions.
+
+        Returns:
+            dict -- The sizes (in bytes) of the extensions, keyed by
+                extension. Sizes that couldn't be determined are None.
         """
-        LOGGER.info('Cleaning up downloaded extensions.')
+        if not extensions:
+            return {}
 
-        if self._output_preexisted == True:
-            for ext in self.extensions:
-                try:
-                    ext_name = '%s/%s.vsix' % (self.output, ext)
-                    os.system('rm -f %s' % (ext_name))
-                    LOGGER.debug('Removed file: %s' % (ext_name))
-                except Exception as e:
-                    LOGGER.error(
-                        'Failed to remove file: %s' % (ext_name),
-                        exc_info=self.verbose)
-        else:
-            try:
-                rmtree(self.output)
-                LOGGER.debug('Removed directory: %s' % (self.output))
-            except IOError as e:
-                LOGGER.error(
-                    'Failed to remove directory: %s' % (self.output),
-                    exc_info=self.verbose)
+        command = '; '.join(
+            'echo "%s $(curl -sIL %s | grep -i \'^content-length\' '
+            '| tail -n 1 | tr -d \'\\r\' | cut -d \' \' -f 2)"' % (
+                extension.id, self._get_vsix_url(extension))
+            for extension in extensions)
 
+        ids = dict((extension.id, extension) for extension in extensions)
+        sizes = dict((extension, None) for extension in extensions)
+        try:
+            for line in self.tunnel.run(command, hide=True).splitlines():
+                id, _, size = line.partition(' ')
+                if id in ids and size.strip().isdigit():
+                    sizes[ids[id]] = int(size)
+        except Exception as e:
+            LOGGER.warning(
+                'Could not determine the download sizes of the extensions.',
+                exc_info=self.verbose)
+        return sizes
 
-    def download(self):
+
+    def _plan_download(self, plan, extensions=None, versions=None,
+                       estimate=False):
         """
-        Downloads all specified extensions over SSH and places them into
-        the directory specified by the configuration options.
+        Adds the actions that download extensions over SSH (into the
+        output directory) to a plan.
+
+        If a remote cache was specified, extensions are fetched into the
+        remote cache (unless they're already cached) and transferred from
+        there instead. If the versions of the extensions are known, the
+        extensions that are already in the output directory aren't
+        downloaded again.
+
+        Arguments:
+            plan {Plan} -- The plan to add the actions to.
+
+        Keyword Arguments:
+            extensions {list|None} -- The extensions to download. If None,
+                all the specified extensions are downloaded. (default: {None})
+            versions {dict|None} -- The latest versions of the extensions,
+                keyed by lowercase extension name. If None, they're looked up
+                when they're needed. (default: {None})
+            estimate {bool} -- If True, the download sizes of extensions that
+                aren't cached are looked up, so the plan's cost can be
+                estimated. (default: {False})
+
+        Returns:
+            list -- The extensions that will be downloaded, with the paths
+                they'll be downloaded to.
         """
-        if self.extensions == None:
+        extensions = extensions or self.extensions
+
+        if extensions == None:
             LOGGER.error(
                 'No extensions have been specified.', exc_info=self.verbose)
             sys.exit(1)
@@ -288,43 +363,377 @@ class ExtensionManager():
                 exc_info=self.verbose)
             sys.exit(1)
 
-        LOGGER.info('Downloading %d extensions to %s' % (
-            len(self.extensions), self.output))
+        # extensions are cached by version, so the versions need to be known
+        # before the extensions are fetched.
+        if self.cache is not None and versions is None:
+            versions = self._get_latest_versions(extensions)
+        versions = versions or {}
+
+        downloads = []
+        downloaded = []
+        for extension in extensions:
+            version = versions.get(extension.id.lower())
+            existing = [e for e in self.inventory.find(extension.id, version)
+                if os.path.dirname(e.path) == self.output
+                and os.path.isfile(e.path)] if version else []
+            if existing:
+                downloaded.append(existing[0])
+            else:
+                downloads.append(
+                    Extension(extension.id, version, path='%s/%s.vsix' % (
+                        self.output, extension.id)))
+
+        for extension in downloaded:
+            plan.add(Steps.skip, extension, reason='already downloaded')
+        if not downloads:
+            return downloaded
+
+        keys = set((e.id, e.version) for e in downloads
+            if self.cache is not None and e.version is not None)
+        cached = self.cache.lookup(list(keys)) if keys else {}
+        sizes = self._get_download_sizes(
+            [e for e in downloads if (e.id, e.version) not in cached]
+        ) if estimate else {}
+
+        plan.add(Steps.prepare, self.output)
+        for extension in downloads:
+            key = (extension.id, extension.version)
+
+            if key not in keys:
+                extension.size = sizes.get(extension)
+                extension.remote_path = extension.path
+                url = self._get_vsix_url(extension)
+                plan.add(Steps.resolve, extension, url=url)
+                plan.add(Steps.fetch, extension, extension.size,
+                    extension=extension, url=url)
+                plan.add(Steps.transfer, extension.path, extension.size,
+                    extension=extension, remove=True)
+            else:
+                extension.size = cached.get(key, sizes.get(extension))
+                extension.remote_path = self.cache.path_for(*key)
+                url = self._get_vsix_url(extension, extension.version)
+                plan.add(Steps.resolve, extension, url=url)
+                plan.add(Steps.fetch, extension,
+                    0 if key in cached else extension.size,
+                    extension=extension, url=url, cached=True)
+                plan.add(Steps.transfer, extension.path, extension.size,
+                    extension=extension, url=url, remove=False)
 
-        # download each extension to the output directory in the ssh tunnel.
-        for extension in self.extensions:
-            download_url = self._get_vsix_url(extension)
-            curl_command = self._get_vsix_curl_command(extension, download_url)
-            LOGGER.info('Downloading extension: %s' % (extension))
+        plan.add(Steps.cleanup, self.output)
 
-            # download the extension via the SSH tunnel
-            self.tunnel.run(curl_command)
+        return downloaded + downloads
 
-            # transfer the extension from the remote host to the local host
-            ext_name = '%s/%s.vsix' % (self.output, extension)
-            LOGGER.debug('Transferring %s from remote' % (ext_name))
-            self.tunnel.get(ext_name, ext_name)
 
-            # delete the extension from the remote host
-            LOGGER.debug('Deleting %s from remote' % (ext_name))
-            self.tunnel.run('rm -f %s' % (ext_name))
+    def _plan_remove(self, plan):
+        """
+        Adds the actions that remove the downloaded extensions from the local
+        host to the end of a plan, unless downloaded files should be kept.
 
-        # delete the remote directory
-        self.tunnel.rmdir(self.output)
+        If the output directory was pre-existing, we don't want to remove it
+        (since there might be other content in there that the user does not
+        want to remove), so only the files of the plan's extensions are
+        removed. If the output directory was not pre-existing (meaning we
+        created it for the purpose of executing pyvsc), then the entire
+        directory is removed.
+
+        Arguments:
+            plan {Plan} -- The plan to add the actions to.
+        """
+        if self.keep or plan.filter(Steps.remove):
+            return
+
+        paths = []
+        for action in plan.filter(Steps.transfer) + plan.filter(Steps.install):
+            if os.path.dirname(action.target) == self.output \
+                    and action.target not in paths:
+                paths.append(action.target)
+        if not paths:
+            return
+
+        if not self._output_preexisted:
+            plan.add(Steps.remove, self.output, directory=True)
+        else:
+            for path in paths:
+                plan.add(Steps.remove, path, directory=False)
+
+
+    def _plan_evict(self, plan):
+        """
+        Adds the action that keeps the remote cache within its maximum size
+        to the end of a plan, if the plan fetches anything into the cache.
+        Eviction runs last, so failing to evict can't keep any extensions
+        from being installed.
+
+        Arguments:
+            plan {Plan} -- The plan to add the action to.
+        """
+        if self.cache is None or plan.filter(Steps.evict):
+            return
+        if any(a.args.get('cached') for a in plan.filter(Steps.fetch)):
+            plan.add(Steps.evict, self.cache.path)
+
+
+    def download(self):
+        """
+        Downloads all specified extensions over SSH and places them into
+        the directory specified by the configuration options.
+        """
+        self.execute(self.plan('download'))
 
 
-    def _install_extension(self, path):
+    def _install_extension(self, path, profile=None):
         """
         Installs an individual VSIX extensions at a specified path.
+
+        Keyword Arguments:
+            profile {Profile|None} -- The profile to install the extension
+                into. If None, the editor's default profile is used.
+                (default: {None})
+
+        Returns:
+            bool -- True if the extension was installed.
         """
+        extension_name = os.path.basename(path)
         try:
-            extension_name = os.path.basename(path)
             LOGGER.info('Installing %s' % (extension_name))
-            os.system('%s --install-extension %s --force' % (self.cmd_dest, path))
+            status = os.system('%s --install-extension %s --force%s' % (
+                self.cmd_dest, path, profile.editor_args() if profile else ''))
+            if status == 0:
+                return True
+            LOGGER.error('Failed to install extension: %s (exit status %d)' % (
+                extension_name, status))
         except Exception as e:
             LOGGER.error(
                 'Failed to install extension: %s' % (extension_name),
                 exc_info=self.verbose)
+        return False
+
+
+    def _get_installed_dirs(self, extensions, profile):
+        """
+        Determines which directories of a profile's extensions directory
+        were unpacked from the specified extensions.
+
+        Arguments:
+            extensions {list} -- The installed extensions.
+            profile {Profile} -- The profile the extensions were installed to.
+
+        Returns:
+            list -- The names of the installed extension directories.
+        """
+        dirnames = set(e.dirname for e in extensions if e.version is not None)
+        return [d for d in os.listdir(profile.extensions_dir)
+            if d.lower() in dirnames]
+
+
+    def _link_tree(self, source, dest):
+        """
+        Recreates a directory tree by hardlinking each of its files, so the
+        new tree doesn't use any additional disk space. If a file can't be
+        hardlinked (ex: the destination is on a different file system), it
+        is copied instead.
+
+        Arguments:
+            source {str} -- The directory to link from.
+            dest {str} -- The directory to create.
+        """
+        for root, dirs, files in os.walk(source):
+            target = os.path.join(dest, os.path.relpath(root, source))
+            if not os.path.isdir(target):
+                os.makedirs(target)
+            for f in files:
+                try:
+                    os.link(os.path.join(root, f), os.path.join(target, f))
+                except OSError as e:
+                    copy2(os.path.join(root, f), os.path.join(target, f))
+
+
+    def _sync_extensions_manifest(self, dirs, source, dest):
+        """
+        Copies the entries of the mirrored extension directories from the
+        source profile's extensions.json to the destination profile's
+        extensions.json (which newer editor versions use to determine which
+        extensions are installed), pointing them to the destination profile.
+
+        Arguments:
+            dirs {list} -- The names of the mirrored extension directories.
+            source {Profile} -- The profile the extensions were mirrored from.
+            dest {Profile} -- The profile the extensions were mirrored to.
+        """
+        source_manifest = os.path.join(source.extensions_dir, 'extensions.json')
+        dest_manifest = os.path.join(dest.extensions_dir, 'extensions.json')
+
+        if not os.path.isfile(source_manifest):
+            return
+
+        with open(source_manifest) as f:
+            entries = json.load(f)
+
+        installed = {}
+        if os.path.isfile(dest_manifest):
+            with open(dest_manifest) as f:
+                for entry in json.load(f):
+                    installed[entry['identifier']['id'].lower()] = entry
+
+        for entry in entries:
+            location = entry.get('location', {})
+            relative = entry.get('relativeLocation') or os.path.basename(
+                location.get('fsPath', location.get('path', '')))
+            if relative not in dirs:
+                continue
+
+            path = os.path.join(dest.extensions_dir, relative)
+            if 'fsPath' in location:
+                location['fsPath'] = path
+            if 'path' in location:
+                location['path'] = path
+            if 'external' in location:
+                location['external'] = 'file://%s' % (pathname2url(path))
+            installed[entry['identifier']['id'].lower()] = entry
+
+        # write to a temporary file first, so the editor never sees a
+        # partially-written manifest.
+        with open(dest_manifest + '.tmp', 'w') as f:
+            json.dump(list(installed.values()), f)
+        os.rename(dest_manifest + '.tmp', dest_manifest)
+
+
+    def _is_mirrored(self, source, dest):
+        """
+        Determines whether a directory tree already has all the files of
+        another directory tree, with the same sizes.
+
+        Arguments:
+            source {str} -- The directory that was mirrored.
+            dest {str} -- The directory to check.
+
+        Returns:
+            bool
+        """
+        for root, dirs, files in os.walk(source):
+            target = os.path.join(dest, os.path.relpath(root, source))
+            for f in files:
+                try:
+                    if os.path.getsize(os.path.join(target, f)) \
+                            != os.path.getsize(os.path.join(root, f)):
+                        return False
+                except OSError as e:
+                    return False
+        return True
+
+
+    def _mirror_profile(self, extensions, source, dest):
+        """
+        Installs already-unpacked extensions from one profile into another.
+
+        Arguments:
+            extensions {list} -- The extensions to mirror.
+            source {Profile} -- The profile the extensions were installed to.
+            dest {Profile} -- The profile to install the extensions into.
+
+        Returns:
+            bool -- True if the extensions were installed.
+        """
+        try:
+            dirs = self._get_installed_dirs(extensions, source)
+            if not os.path.isdir(dest.extensions_dir):
+                os.makedirs(dest.extensions_dir)
+
+            for d in dirs:
+                source_dir = os.path.join(source.extensions_dir, d)
+                dest_dir = os.path.join(dest.extensions_dir, d)
+
+                # identical extension directories don't need to be relinked
+                if os.path.isdir(dest_dir) \
+                        and self._is_mirrored(source_dir, dest_dir):
+                    LOGGER.debug('%s is already installed in %s' % (d, dest))
+                    continue
+                LOGGER.info('Installing %s into %s' % (d, dest))
+
+                # link into a hidden temporary directory first, so an
+                # interrupted run never leaves a partially-linked extension
+                # directory where the editor (or the next run) would find it.
+                temp_dir = os.path.join(dest.extensions_dir, '.%s.tmp' % (d))
+                if os.path.isdir(temp_dir):
+                    rmtree(temp_dir)
+                self._link_tree(source_dir, temp_dir)
+                if os.path.isdir(dest_dir):
+                    rmtree(dest_dir)
+                os.rename(temp_dir, dest_dir)
+
+            self._sync_extensions_manifest(dirs, source, dest)
+            return True
+        except Exception as e:
+            LOGGER.error(
+                'Failed to install extensions into %s' % (dest),
+                exc_info=self.verbose)
+            return False
+
+
+    def _get_install_extensions(self, extension_path):
+        """
+        Returns the extension at the specified path or all the
+        extensions in the specified directory.
+        """
+        if extension_path is None:
+            LOGGER.error('No path to install extension(s) from. Please specify '
+                'a .vsix file or a directory of .vsix files with -e.')
+            sys.exit(1)
+
+        # the extensions directory has already been scanned
+        if extension_path == self.extensions_dir:
+            return self.extensions
+
+        try:
+            if os.path.isfile(extension_path):
+                return [self.inventory.lookup(os.path.abspath(extension_path))]
+            elif os.path.isdir(extension_path):
+                return self.inventory.scan(extension_path)
+        except ValueError as e:
+            pass
+
+        LOGGER.error('Cannot install extension(s) from the path "%s".' % (
+            extension_path), exc_info=self.verbose)
+        sys.exit(1)
+
+
+    def _plan_install(self, plan, extensions):
+        """
+        Adds the actions that install .vsix extensions into each of the
+        specified profiles to a plan.
+
+        If multiple profiles were specified, the extensions are only unpacked
+        into the first profile, and then linked into the other profiles
+        in parallel. If more than one version of an extension is given, only
+        the newest version is installed.
+
+        Arguments:
+            plan {Plan} -- The plan to add the actions to.
+            extensions {list} -- The extensions to install. Their .vsix files
+                don't need to exist until the plan is executed.
+        """
+        profile = self.profiles[0] if self.profiles else None
+        newest = {}
+        for extension in extensions:
+            key = (extension.id.lower(), extension.target_platform)
+            if key not in newest \
+                    or extension.version_key > newest[key].version_key:
+                newest[key] = extension
+
+        installed = []
+        for extension in extensions:
+            key = (extension.id.lower(), extension.target_platform)
+            if newest[key] is not extension:
+                plan.add(Steps.skip, extension.path, reason='%s is newer' % (
+                    newest[key]))
+                continue
+            plan.add(Steps.install, extension.path, extension.size,
+                extension=extension, profile=profile)
+            installed.append(extension)
+
+        for dest in self.profiles[1:]:
+            plan.add(Steps.link, dest.extensions_dir, parallel=True,
+                extensions=installed, source=profile, dest=dest)
 
 
     def install(self, extension_path=None):
@@ -332,34 +741,385 @@ class ExtensionManager():
         Installs the extension at the specified path or all the
         extensions in the specified directory.
         """
-        # if no extension_path was provided, assume we want to install the
-        # extensions from the output directory.
-        extension_path = extension_path or self.extensions_dir
-
-        if os.path.isfile(extension_path):
-            self._install_extension(extension_path)
-        elif os.path.isdir(extension_path):
-            for f in os.listdir(extension_path):
-                self._install_extension('%s/%s' % (extension_path, f))
-        else:
-            LOGGER.error('Cannot install extension(s) from the path "%s".' % (
-                extension_path), exc_info=self.verbose)
-            sys.exit(1)
+        self.execute(self.plan('install', extension_path))
 
 
     def update(self):
         """
         Downloads the latest versions of all specified extensions
-        to the output directory, and then passes the output directory
-        as the source for extensions that should be installed.
+        to the output directory, and then installs them.
         """
-        self.download()
-        self.install(self.output)
+        self.execute(self.plan('update'))
+
+
+    def _get_installed_versions(self):
+        """
+        Returns the versions of the extensions that are currently installed
+        in the destination editor.
+
+        Returns:
+            dict -- The installed versions, keyed by lowercase extension name.
+        """
+        profile = self.profiles[0] if self.profiles else None
+        lines = os.popen('%s --list-extensions --show-versions%s' % (
+            self.cmd_dest, profile.editor_args() if profile else '')
+        ).read().splitlines()
+        extensions = [Extension.parse(line) for line in lines if '@' in line]
+        return dict((e.id.lower(), e.version) for e in extensions)
+
+
+    def _get_latest_versions(self, extensions):
+        """
+        Queries the extension marketplace (via the ssh tunnel) for the latest
+        versions of the specified extensions.
+
+        Arguments:
+            extensions {list} -- The extensions to look up.
+
+        Returns:
+            {dict|None} -- The latest versions, keyed by lowercase extension
+                name. Extensions that couldn't be found are omitted. None if
+                the marketplace couldn't be queried.
+        """
+        query = json.dumps({
+            'filters': [{
+                'criteria': [{
+                    'filterType': 8, 'value': 'Microsoft.VisualStudio.Code'
+                }] + [{'filterType': 7, 'value': e.id} for e in extensions],
+                'pageNumber': 1,
+                'pageSize': len(extensions),
+            }],
+            # IncludeVersions | IncludeLatestVersionOnly
+            'flags': 0x201,
+        })
+        command = 'curl -s -X POST ' \
+            '-H "Content-Type: application/json" ' \
+            '-H "Accept: application/json;api-version=3.0-preview.1" ' \
+            '-d \'%s\' https://marketplace.visualstudio.com' \
+            '/_apis/public/gallery/extensionquery' % (query)
+
+        try:
+            results = json.loads(self.tunnel.run(command, hide=True))
+            return dict(
+                (('%s.%s' % (e['publisher']['publisherName'],
+                    e['extensionName'])).lower(), e['versions'][0]['version'])
+                for e in results['results'][0]['extensions'])
+        except Exception as e:
+            LOGGER.error(
+                'Failed to query the latest extension versions.',
+                exc_info=self.verbose)
+            return None
+
+
+    def _plan_changed(self, plan, installed, estimate=False):
+        """
+        Adds the actions that download and install only the extensions that
+        have a newer version than the installed version to a plan.
+
+        Arguments:
+            plan {Plan} -- The plan to add the actions to.
+            installed {dict} -- The installed extension versions, keyed by
+                lowercase extension name.
+
+        Keyword Arguments:
+            estimate {bool} -- If True, the download sizes of the extensions
+                are looked up. (default: {False})
+
+        Returns:
+            dict -- The versions that will be installed, keyed by lowercase
+                extension name.
+        """
+        latest = self._get_latest_versions(self.extensions)
+        changed = []
+
+        for extension in self.extensions:
+            if latest is None:
+                plan.add(Steps.skip, extension, reason='version lookup failed')
+                continue
+
+            version = latest.get(extension.id.lower())
+            if version is None:
+                plan.add(Steps.skip, extension, reason='not found')
+            elif version == installed.get(extension.id.lower()):
+                plan.add(Steps.skip, extension, reason='up to date')
+            else:
+                changed.append(extension)
+
+        if changed:
+            self._plan_install(plan, self._plan_download(
+                plan, changed, latest, estimate))
+            self._plan_remove(plan)
+            self._plan_evict(plan)
+
+        return dict((e.id.lower(), latest[e.id.lower()]) for e in changed)
+
+
+    def daemon(self):
+        """
+        Keeps running, and periodically downloads and installs the
+        extensions that have been updated since they were installed.
+        """
+        installed = self._get_installed_versions()
+        LOGGER.info('Checking %d extensions for updates every %d seconds.' % (
+            len(self.extensions), self.interval))
+
+        while True:
+            try:
+                self.tunnel.reconnect()
+                plan = Plan('daemon')
+                versions = self._plan_changed(plan, installed)
+
+                if not versions:
+                    LOGGER.info('No extension updates to install.')
+                else:
+                    self.execute(plan)
+
+                    # only remember the versions that were actually installed,
+                    # so failed installs are retried on the next check.
+                    for action in plan.filter(Steps.install):
+                        id = action.args['extension'].id.lower()
+                        if action.succeeded and id in versions:
+                            installed[id] = versions[id]
+            except Exception as e:
+                LOGGER.error(
+                    'Failed to update extensions.', exc_info=self.verbose)
+            sleep(self.interval)
+
+
+    def plan(self, action, extension_path=None, estimate=False):
+        """
+        Plans the steps that a vsc action will take, without taking them.
+
+        Arguments:
+            action {str} -- The vsc action to plan.
+
+        Keyword Arguments:
+            extension_path {str|None} -- The path to the extension(s) to
+                install. If None, the extensions directory that was specified
+                is used. (default: {None})
+            estimate {bool} -- If True, the download sizes of the extensions
+                are looked up, so the plan can be shown with an estimate of
+                its cost. (default: {False})
+
+        Returns:
+            Plan
+        """
+        plan = Plan(action)
+
+        if action == 'download':
+            self._plan_download(plan, estimate=estimate)
+        elif action == 'install':
+            self._plan_install(plan, self._get_install_extensions(
+                extension_path or self.extensions_dir))
+        elif action == 'update':
+            self._plan_install(
+                plan, self._plan_download(plan, estimate=estimate))
+        elif action == 'daemon':
+            # a daemon runs the same plan as a single check for updates
+            self._plan_changed(
+                plan, self._get_installed_versions(), estimate)
+
+        self._plan_remove(plan)
+        self._plan_evict(plan)
+        return plan
+
+
+    def _execute_prepare(self, action):
+        """
+        Creates the output directory on the local and remote hosts.
+        """
+        self._get_valid_dir(action.target, True)
+
+
+    def _execute_resolve(self, action):
+        """
+        Logs where an extension will be downloaded from.
+        """
+        LOGGER.debug('Resolved %s to %s' % (action.target, action.args['url']))
+
+
+    def _execute_fetch(self, action):
+        """
+        Downloads an extension to the remote host.
+        """
+        # download the extension via the SSH tunnel
+        extension = action.args['extension']
+        LOGGER.info('Downloading extension: %s' % (extension))
+        if action.args.get('cached'):
+            extension.sha256 = self.cache.fetch(
+                extension.id, extension.version, action.args['url'])
+        else:
+            self.tunnel.run(self._get_vsix_curl_command(
+                extension, action.args['url']))
+
+
+    def _execute_transfer(self, action):
+        """
+        Moves a downloaded extension from the remote host to the local host.
+        """
+        # transfer the extension from the remote host to the local host
+        extension = action.args['extension']
+        remote = extension.remote_path
+        LOGGER.debug('Transferring %s from remote' % (remote))
+        try:
+            self.tunnel.get(remote, action.target)
+        except IOError as e:
+            if action.args['remove']:
+                raise
+
+            # the cached extension was evicted by another vsc user since it
+            # was fetched, so fetch it into the cache again.
+            LOGGER.debug('%s was evicted, fetching it again' % (remote))
+            extension.sha256 = self.cache.fetch(
+                extension.id, extension.version, action.args['url'])
+            self.tunnel.get(remote, action.target)
+
+        # delete the extension from the remote host, unless it's cached
+        if action.args['remove']:
+            LOGGER.debug('Deleting %s from remote' % (remote))
+            self.tunnel.run('rm -f %s' % (remote))
+
+        try:
+            record = Extension.from_vsix(
+                action.target, checksum=extension.sha256 is not None)
+        except ValueError as e:
+            record = None
+            LOGGER.warning(e)
+
+        # other users of the cache can change the cached extensions, so make
+        # sure the transferred file is the one that was fetched into the cache
+        if extension.sha256 is not None and (
+                record is None or record.sha256 != extension.sha256):
+            LOGGER.error('%s does not match the SHA-256 hash of %s, so it '
+                'won\'t be installed.' % (action.target, remote))
+            os.remove(action.target)
+            self.inventory.remove(action.target)
+            return False
+
+        # record the downloaded extension in the inventory
+        if record is not None:
+            self.inventory.add(record)
+
+
+    def _execute_install(self, action):
+        """
+        Installs an extension into a profile.
+        """
+        extension = action.args['extension']
+        if not os.path.isfile(action.target):
+            LOGGER.error('Cannot install %s, since it wasn\'t downloaded.' % (
+                action.target))
+            return False
+
+        succeeded = self._install_extension(
+            action.target, action.args['profile'])
+
+        # the versions of extensions that were downloaded by this plan aren't
+        # known until they've been downloaded.
+        if extension.version is None:
+            try:
+                record = self.inventory.lookup(extension.path)
+                extension.version = record.version
+                extension.target_platform = record.target_platform
+            except (OSError, ValueError) as e:
+                LOGGER.warning('Could not read %s' % (extension.path))
+
+        return succeeded
+
+
+    def _execute_link(self, action):
+        """
+        Links the installed extensions into another profile.
+        """
+        return self._mirror_profile(
+            action.args['extensions'], action.args['source'],
+            action.args['dest'])
+
+
+    def _execute_skip(self, action):
+        """
+        Logs why an extension is being skipped.
+        """
+        LOGGER.info('Skipping %s (%s)' % (action.target, action.args['reason']))
+
+
+    def _execute_remove(self, action):
+        """
+        Removes downloaded extensions from the local host.
+        """
+        try:
+            if action.args['directory']:
+                rmtree(action.target)
+                self.inventory.remove_directory(action.target)
+            else:
+                os.remove(action.target)
+                self.inventory.remove(action.target)
+            LOGGER.debug('Removed %s' % (action.target))
+        except (IOError, OSError) as e:
+            LOGGER.error(
+                'Failed to remove %s' % (action.target), exc_info=self.verbose)
+            return False
+
+
+    def _execute_evict(self, action):
+        """
+        Keeps the remote cache within its maximum size.
+        """
+        try:
+            self.cache.evict()
+        except Exception as e:
+            LOGGER.warning(
+                'Failed to evict extensions from %s' % (action.target),
+                exc_info=self.verbose)
+
+
+    def _execute_cleanup(self, action):
+        """
+        Removes the output directory from the remote host.
+        """
+        # delete the remote directory
+        self.tunnel.rmdir(action.target)
+
+
+    def execute(self, plan):
+        """
+        Executes the actions of a plan in order. Consecutive actions that can
+        run in parallel are run at the same time. Each action records whether
+        it succeeded.
+
+        Arguments:
+            plan {Plan} -- The plan to execute.
+        """
+        LOGGER.info('Executing %s (%d actions)' % (
+            plan.name, len(plan.actions)))
+        def run(action):
+            # handlers only return False when their action failed
+            result = getattr(self, '_execute_%s' % (action.step))(action)
+            action.succeeded = result is not False
+
+        i = 0
+        while i < len(plan.actions):
+            batch = [plan.actions[i]]
+            while batch[-1].parallel and i + len(batch) < len(plan.actions) \
+                    and plan.actions[i + len(batch)].parallel:
+                batch.append(plan.actions[i + len(batch)])
+
+            if len(batch) == 1:
+                run(batch[0])
+            else:
+                pool = ThreadPool(len(batch))
+                try:
+                    pool.map(run, batch)
+                finally:
+                    pool.close()
+                    pool.join()
+            i += len(batch)
 
 
     def _process_output_directory(self, directory):
         """
         Resolves an absolute path to the specified extension output directory.
+        The directory isn't created until a plan that uses it is executed.
         
         Arguments:
             directory {str} -- The path to the output directory.
@@ -367,7 +1127,27 @@ class ExtensionManager():
         Returns:
             str -- The absolute path to the output directory.
         """
-        return self._get_valid_dir(directory, True)
+        d = os.path.abspath(os.path.expanduser(directory))
+        self._output_preexisted = os.path.isdir(d)
+        return d
+
+
+    def _process_inventory(self, path):
+        """
+        Opens the inventory of downloaded extensions. During a dry-run, the
+        inventory is opened read-only, and isn't created if it doesn't exist.
+
+        Arguments:
+            path {str|None} -- The path to the inventory database.
+
+        Returns:
+            Inventory
+        """
+        path = os.path.abspath(os.path.expanduser(
+            path or '~/.vsc/inventory.db'))
+        if self.dry_run and not os.path.isfile(path):
+            path = ':memory:'
+        return Inventory(path, readonly=self.dry_run)
 
 
     def _process_extensions(self, extensions):
@@ -379,14 +1159,15 @@ class ExtensionManager():
             extensions {str|list|None} -- The argued extension names to involve
         
         Returns:
-            list -- A list of extension names that will be processed
+            list -- A list of the extensions that will be processed
         """
         # if the user did not specify any extensions, we'll assume that they
         # want to update all of their currently-installed extensions.
         if extensions is None or extensions == '':
             LOGGER.debug('Processing extensions from %s.' % (self.cmd_source))
-            extensions = os.popen('%s --list-extensions' % (self.cmd_source)
-            ).read().splitlines()
+            extensions = [Extension.parse(e) for e in os.popen(
+                '%s --list-extensions' % (self.cmd_source)
+            ).read().splitlines() if e.strip()]
 
         # otherwise, if we were given a string of one or more extensions,
         # we need to determine if we were given a path to a directory of
@@ -399,12 +1180,25 @@ class ExtensionManager():
             # extensions in the directory.
             if directory is not None:
                 self.extensions_dir = directory
-                extensions = self._get_directory_vsix_files(directory)
+                extensions = self.inventory.scan(directory)
 
             # If a literal string of extension names was provided, convert the
             # string to a list of extensions.
             else:
-                extensions = re.split(';|,', extensions)
+                try:
+                    parsed = [Extension.parse(e)
+                        for e in re.split(';|,', extensions) if e.strip()]
+                except ValueError as e:
+                    LOGGER.error(e)
+                    sys.exit(1)
+
+                # ignore extensions that were specified more than once
+                extensions = []
+                seen = set()
+                for extension in parsed:
+                    if extension.id.lower() not in seen:
+                        seen.add(extension.id.lower())
+                        extensions.append(extension)
 
         # make sure we're dealing with a list
         try:
@@ -417,6 +1211,33 @@ class ExtensionManager():
             sys.exit(1)
 
 
+    def _process_profiles(self, extensions_dirs, user_data_dirs):
+        """
+        Parses the profile arguments to determine which editor profiles the
+        extensions should be installed into.
+
+        Arguments:
+            extensions_dirs {str|None} -- A string of one or more extensions
+                directories.
+            user_data_dirs {str|None} -- A string of one or more user data
+                directories, one for each extensions directory.
+
+        Returns:
+            list -- A list of Profiles. An empty list means that the
+                editor's default profile should be used.
+        """
+        if not extensions_dirs:
+            return []
+
+        extensions_dirs = [os.path.abspath(os.path.expanduser(d))
+            for d in re.split(';|,', extensions_dirs)]
+        user_data_dirs = [os.path.abspath(os.path.expanduser(d))
+            for d in re.split(';|,', user_data_dirs)] if user_data_dirs \
+            else [None] * len(extensions_dirs)
+
+        return [Profile(e, u) for e, u in zip(extensions_dirs, user_data_dirs)]
+
+
 
 class CustomFormatter(configargparse.HelpFormatter):
     def _format_action_invocation(self, action):
@@ -476,7 +1297,7 @@ def validate_options(parser):
         LOGGER.error('Please specify an action to perform.')
         print(parser.format_help())
         sys.exit(1)
-    elif options.action not in ['download', 'install', 'update']:
+    elif options.action not in ['download', 'install', 'update', 'daemon']:
         LOGGER.error('"%s" is not a valid vsc action.' % (options.action))
         print(parser.format_help())
         sys.exit(1)
@@ -493,6 +1314,44 @@ def validate_options(parser):
             '-s, --source\n-d, --dest\n')
         sys.exit(1)
 
+    # the bandwidth is used to estimate transfer times, so it must be positive
+    try:
+        options.bandwidth = float(options.bandwidth)
+    except ValueError as e:
+        options.bandwidth = 0
+    if options.bandwidth <= 0:
+        LOGGER.error('The bandwidth must be a number greater than 0.')
+        sys.exit(1)
+
+    # each user data directory belongs to the profile of the extensions
+    # directory in the same position, so they need to be specified together.
+    if options.user_data_dir and (not options.extensions_dir or
+            len(re.split(';|,', options.user_data_dir))
+            != len(re.split(';|,', options.extensions_dir))):
+        LOGGER.error(
+            'Each user data directory must be paired with an extensions\n'
+            'directory. Please specify the same number of directories for:\n\n'
+            '--extensions-dir\n--user-data-dir\n')
+        sys.exit(1)
+
+    # the daemon sleeps for the interval between checks, so it must be
+    # positive, and a keepalive interval of 0 disables keepalive packets.
+    try:
+        options.interval = int(options.interval)
+    except ValueError as e:
+        options.interval = 0
+    if options.interval <= 0:
+        LOGGER.error('The interval must be a whole number greater than 0.')
+        sys.exit(1)
+
+    try:
+        options.keepalive = int(options.keepalive)
+    except ValueError as e:
+        options.keepalive = -1
+    if options.keepalive < 0:
+        LOGGER.error('The keepalive must be a whole number of at least 0.')
+        sys.exit(1)
+
     # Keep downloaded files if any of the following are true:
     # - the keep options was explicitely provided
     # - the action is 'download'
@@ -510,7 +1369,7 @@ def main():
     )
 
     # specify the parser options
-    parser.add('action', nargs='?', help='The VSCode Extension Manager action to execute: [download|install|update]')
+    parser.add('action', nargs='?', help='The VSCode Extension Manager action to execute: [download|install|update|daemon]')
     parser.add_argument('--help', action="help", help="Show help message")
     parser.add_argument('-c', '--config', is_config_file=True, help='config file path')
     parser.add_argument('-d', '--dest-editor', default='', help='The editor where the extensions will be installed')
@@ -526,6 +1385,14 @@ def main():
     parser.add_argument('-v', '--verbose', default=False, action='store_true', help='Display more program output')
     parser.add_argument('--insiders', default=False, action='store_true', help='Use VSCode Insiders as the source and destination editor')
     parser.add_argument('--codium', default=False, action='store_true', help='Use VSCodium as the source and destination editor')
+    parser.add_argument('--interval', default=900, help='Seconds between checks for extension updates in daemon mode')
+    parser.add_argument('--keepalive', default=30, help='Seconds between ssh keepalive packets (0 to disable)')
+    parser.add_argument('--bandwidth', default=1.0, help='Expected transfer rate of the ssh connection in MB/s, used to estimate dry-run transfer times')
+    parser.add_argument('--remote-cache', default='', help='A directory on the SSH host where downloaded extensions are cached and shared between runs')
+    parser.add_argument('--remote-cache-size', default=1024, help='The maximum size of the remote cache in MB')
+    parser.add_argument('--inventory', default='~/.vsc/inventory.db', help='The path to the index of downloaded extensions')
+    parser.add_argument('--extensions-dir', default='', help='One or more extensions directories (profiles) to install the extensions into')
+    parser.add_argument('--user-data-dir', default='', help='One or more user data directories, one for each extensions directory')
 
     # validate the configuration options
     options = validate_options(parser)
@@ -538,6 +1405,7 @@ def main():
         gateway=options.ssh_gateway,
         verbose=options.verbose,
         dry_run=options.dry_run,
+        keepalive=options.keepalive,
     )
 
     # initialize an instance of the VSC Manager
@@ -555,11 +1423,20 @@ def main():
         keep=options.keep,
         insiders=options.insiders,
         codium=options.codium,
+        extensions_dirs=options.extensions_dir,
+        user_data_dirs=options.user_data_dir,
+        interval=options.interval,
+        bandwidth=options.bandwidth,
+        remote_cache=options.remote_cache,
+        remote_cache_size=options.remote_cache_size,
+        inventory=options.inventory,
+        verbose=options.verbose,
     )
 
-    # TODO: Implement more thorough dry-run functionality.
-    # if it's just a dry-run, don't perform the action
+    # if it's just a dry-run, show the plan instead of performing the action
     if options.dry_run:
+        print(manager.plan(options.action, estimate=True).format(
+            manager.bandwidth))
         LOGGER.info('Dry-run only. Exiting..')
         sys.exit(0)
 
@@ -572,8 +1449,7 @@ def main():
     except Exception as e:
         LOGGER.error(e)
     finally:
-        if not options.keep:
-            manager.cleanup_output_dir()
+        manager.inventory.close()
 
 if __name__ == "__main__":
     main()
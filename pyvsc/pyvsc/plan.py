@@ -0,0 +1,151 @@
+"""
+Explicit plans of the steps that a vsc action will take, so they can be
+previewed (along with an estimate of their cost) before being executed.
+"""
+
+from datetime import timedelta
+
+
+class Steps:
+    """
+    These represent the kinds of steps that a plan can be made up of.
+    """
+    prepare = 'prepare'
+    resolve = 'resolve'
+    fetch = 'fetch'
+    transfer = 'transfer'
+    install = 'install'
+    link = 'link'
+    skip = 'skip'
+    evict = 'evict'
+    cleanup = 'cleanup'
+    remove = 'remove'
+
+
+class Action:
+    """
+    A single step of a plan.
+
+    Arguments:
+        step {str} -- The kind of step (one of Steps).
+        target {str} -- The extension, file, or directory the step acts on.
+
+    Keyword Arguments:
+        size {int|None} -- The expected number of bytes the step moves, if
+            known (default: {None})
+        parallel {bool} -- If True, the step can run at the same time as
+            neighboring parallel steps (default: {False})
+
+    Any other keyword arguments are kept as the arguments of the step.
+    """
+    def __init__(self, step, target, size=None, parallel=False, **kwargs):
+        self.step = step
+        self.target = target
+        self.size = size
+        self.parallel = parallel
+        self.args = kwargs
+
+        # whether the action succeeded, once it has been executed
+        self.succeeded = None
+
+
+    def __repr__(self):
+        if 'reason' in self.args:
+            return '%-9s %s (%s)' % (self.step, self.target, self.args['reason'])
+        return '%-9s %s' % (self.step, self.target)
+
+
+class Plan:
+    """
+    An ordered list of the actions that a vsc action will take.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.actions = []
+
+
+    def add(self, step, target, size=None, parallel=False, **kwargs):
+        """
+        Appends an action to the plan.
+
+        Returns:
+            Action -- The added action.
+        """
+        action = Action(step, target, size, parallel, **kwargs)
+        self.actions.append(action)
+        return action
+
+
+    def filter(self, step):
+        """
+        Returns the actions of the plan that perform a specific step.
+        """
+        return [a for a in self.actions if a.step == step]
+
+
+    def total_bytes(self, step):
+        """
+        Returns the total number of bytes the actions of a step are expected
+        to move. Actions with an unknown size aren't counted.
+        """
+        return sum(a.size for a in self.filter(step) if a.size is not None)
+
+
+    def estimate(self, bandwidth):
+        """
+        Estimates how long the transfers of the plan will take.
+
+        Arguments:
+            bandwidth {float} -- The transfer rate of the ssh link in MB/s.
+
+        Returns:
+            timedelta
+        """
+        seconds = self.total_bytes(Steps.transfer) / (bandwidth * 1024 ** 2)
+        return timedelta(seconds=int(round(seconds)))
+
+
+    def format(self, bandwidth):
+        """
+        Returns a human-readable description of the plan.
+
+        Arguments:
+            bandwidth {float} -- The transfer rate of the ssh link in MB/s.
+
+        Returns:
+            str
+        """
+        lines = ['Plan: %s (%d actions)' % (self.name, len(self.actions))]
+        for action in self.actions:
+            lines.append('  %-60s %10s' % (action, format_size(action.size)))
+
+        unknown = len([a for a in self.filter(Steps.transfer)
+            if a.size is None])
+        lines.append('Fetch: %s | Transfer: %s | Estimated transfer time: '
+            '%s at %.1f MB/s' % (
+                format_size(self.total_bytes(Steps.fetch)),
+                format_size(self.total_bytes(Steps.transfer)),
+                self.estimate(bandwidth), bandwidth))
+        if unknown:
+            lines.append('The size of %d transfers could not be determined.' % (
+                unknown))
+        return '\n'.join(lines)
+
+
+def format_size(size):
+    """
+    Formats a number of bytes as a human-readable string.
+
+    Arguments:
+        size {int|None} -- The number of bytes.
+
+    Returns:
+        str -- ex: '12.3 MB', or '' if the size is None.
+    """
+    if size is None:
+        return ''
+    for unit in ['B', 'KB', 'MB']:
+        if size < 1024:
+            return '%.1f %s' % (size, unit) if unit != 'B' else '%d B' % (size)
+        size /= 1024.0
+    return '%.1f GB' % (size)
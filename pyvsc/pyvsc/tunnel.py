@@ -13,6 +13,8 @@ class Tunnel:
         port = kwargs.get('port')
         user = kwargs.get('user')
         gateway = kwargs.get('gateway')
+        self.verbose = verbose
+        self.keepalive = kwargs.get('keepalive', 0)
 
         if verbose:
             LOGGER.setLevel(__debug__)
@@ -20,6 +22,52 @@ class Tunnel:
         # Establish the ssh & sftp connections
         self.ssh = self.get_ssh_connection(host, port, user, gateway)
         self.sftp = self.get_sftp_client(self.ssh)
+        self.set_keepalive(self.keepalive)
+
+
+    def set_keepalive(self, interval):
+        """
+        Sends a keepalive packet over the ssh connection after every
+        interval of inactivity, so idle connections aren't dropped.
+
+        Arguments:
+            interval {int} -- seconds between keepalive packets (0 disables
+                keepalive packets).
+        """
+        try:
+            self.ssh.transport.set_keepalive(interval)
+        except Exception as e:
+            LOGGER.warning('Could not set the ssh keepalive interval.')
+
+
+    def is_active(self):
+        """
+        Returns True if the ssh connection to the remote host is still open.
+        """
+        try:
+            return self.ssh.is_connected and self.ssh.transport.is_active()
+        except Exception as e:
+            return False
+
+
+    def reconnect(self):
+        """
+        Re-establishes the ssh & sftp connections if they've been dropped.
+        The original connection settings (including the password) are
+        reused, so the user isn't prompted again.
+        """
+        if self.is_active():
+            return
+
+        LOGGER.info('Reconnecting to %s' % (self.ssh.host))
+        try:
+            self.ssh.close()
+        except Exception as e:
+            pass
+
+        self.ssh.open()
+        self.sftp = self.get_sftp_client(self.ssh)
+        self.set_keepalive(self.keepalive)
 
 
     def get_sftp_client(self, ssh_connection):
@@ -125,17 +173,21 @@ class Tunnel:
         self.ssh.run('rm -rf %s' % (path))
 
 
-    def run(self, command):
+    def run(self, command, hide=False):
         """
         Executes a command on the remote host over ssh and returns the output.
 
         Arguments:
             command {str} -- The command to execute
 
+        Keyword Arguments:
+            hide {bool} -- If True, the output of the command isn't echoed
+                to the local terminal (default: {False})
+
         Returns:
             str -- The output of executing the command from the remote host
         """
-        result = self.ssh.run(command)
+        result = self.ssh.run(command, hide=hide)
         if result.exited > 0:
             return result.stderr
         return result.stdout